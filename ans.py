@@ -0,0 +1,186 @@
+""" rANS (range asymmetric numeral systems) algorithm """
+from collections import Counter
+
+TABLE = dict[str, int]
+
+PROB_BITS = 12
+STATE_BITS = 23
+MAX_PROB_BITS = 15
+
+
+class RANS:
+    """
+    rANS algorithm with byte-wise output.
+
+    Unlike Huffman, a letter takes a fractional number of bits, so skewed
+    frequencies are coded closer to their entropy. Frequencies are scaled
+    to a power of two, so decoding looks the letter up in a table
+    by the low bits of the state.
+
+    It has the same interface as Huffman in deflate.py
+    (encode returns encoded message and table, decode takes both),
+    so it can be used as the entropy stage of Deflate.
+    """
+    def get_table(self, message: str) -> TABLE:
+        """frequencies of letters scaled to a power of two
+
+        Args:
+            message (str): message to encode
+
+        Returns:
+            TABLE: letter -> frequency (sum of them is a power of two)
+
+        >>> rans = RANS()
+        >>> rans.get_table('abacabacacabaca')
+        {'a': 2185, 'b': 819, 'c': 1092}
+        """
+        counts = Counter(message)
+
+        precision = max(PROB_BITS, (len(counts) - 1).bit_length() + 2)
+        if precision > MAX_PROB_BITS:
+            raise ValueError(f"too many different letters: {len(counts)}")
+
+        total = 1 << precision
+        length = len(message)
+
+        # every letter has to get at least 1
+        table = {letter: max(1, count * total // length) for letter, count in counts.items()}
+
+        # give the rest to the most frequent letter
+        most_frequent = max(table, key=table.get)
+        table[most_frequent] += max(0, total - sum(table.values()))
+
+        # or take the excess from the most frequent ones
+        excess = sum(table.values()) - total
+        for letter in sorted(table, key=table.get, reverse=True):
+            if excess <= 0:
+                break
+
+            taken = min(excess, table[letter] - 1)
+            table[letter] -= taken
+            excess -= taken
+
+        return table
+
+    @staticmethod
+    def _cumulative(table: TABLE) -> tuple[dict, int]:
+        """start of every letter in [0, total) and number of precision bits"""
+        cumulative = {}
+        start = 0
+
+        for letter, frequency in table.items():
+            cumulative[letter] = start
+            start += frequency
+
+        return cumulative, start.bit_length() - 1
+
+    def encode(self, message: str) -> tuple[str, TABLE]:
+        """encode by rANS algorithm
+
+        Args:
+            message (str): message to encode
+
+        Returns:
+            tuple[str, TABLE]: encoded message ('0' and '1' string) and table
+
+        >>> rans = RANS()
+        >>> encoded, table = rans.encode('abacabacacabaca')
+        >>> len(encoded)
+        80
+        """
+        if not message:
+            return format(0, '032b'), {}
+
+        table = self.get_table(message)
+        cumulative, precision = self._cumulative(table)
+
+        # state never gets bigger than this limit after encoding a letter
+        limits = {letter: ((1 << STATE_BITS) >> precision << 8) * frequency
+                  for letter, frequency in table.items()}
+
+        state = 1 << STATE_BITS
+        output = bytearray()
+
+        # rANS works as a stack, so letters are encoded from the end
+        for letter in reversed(message):
+            frequency = table[letter]
+
+            while state >= limits[letter]:
+                output.append(state & 0xff)
+                state >>= 8
+
+            state = ((state // frequency) << precision) + state % frequency + cumulative[letter]
+
+        output.reverse()
+        data = len(message).to_bytes(4, 'big') + state.to_bytes(4, 'big') + bytes(output)
+
+        return format(int.from_bytes(data, 'big'), f'0{len(data) * 8}b'), table
+
+    def decode(self, message: str, table: TABLE) -> str:
+        """Decode message by rANS algorithm
+
+        Args:
+            message (str): encoded message
+            table (TABLE): table that was created while encoding
+
+        Returns:
+            str: decoded message
+
+        >>> rans = RANS()
+        >>> rans.decode(*rans.encode('abacabacacabaca'))
+        'abacabacacabaca'
+        """
+        data = int(message, 2).to_bytes(len(message) // 8, 'big')
+        length = int.from_bytes(data[:4], 'big')
+
+        if not length:
+            return ""
+
+        cumulative, precision = self._cumulative(table)
+        mask = (1 << precision) - 1
+
+        # letter for every value of the low bits of the state
+        slots = []
+        for letter, frequency in table.items():
+            slots.extend([letter] * frequency)
+
+        state = int.from_bytes(data[4:8], 'big')
+        idx = 8
+        lower_bound = 1 << STATE_BITS
+        result = []
+
+        for _ in range(length):
+            slot = state & mask
+            letter = slots[slot]
+            result.append(letter)
+
+            state = table[letter] * (state >> precision) + slot - cumulative[letter]
+
+            while state < lower_bound:
+                state = (state << 8) | data[idx]
+                idx += 1
+
+        return "".join(result)
+
+    def assertion(self, message: str, verbose = False):
+        """Checks weather message == decode(encode(message))
+
+        Args:
+            message (str): test message
+            verbose (bool, optional): Show full info. Defaults to False.
+
+        >>> rans = RANS()
+        >>> rans.assertion('this is an example of a huffman tree')
+        """
+        encoded, table = self.encode(message)
+
+        if verbose:
+            print(f"Encoded: {encoded}")
+            print(f"Table: {table}")
+
+        assert message == self.decode(encoded, table)
+
+
+if __name__ == "__main__":
+    rans = RANS()
+    rans.assertion('this is an example of a huffman tree', verbose=True)
@@ -0,0 +1,152 @@
+""" Automatic choice of a codec """
+from collections import Counter
+from math import log2
+
+SAMPLE_SIZE = 4096
+SAMPLE_WINDOWS = 4
+MATCH_LENGTH = 4
+
+# smallest part of the size that a codec has to save to be used
+MIN_GAIN = 0.05
+# part of positions that repeat earlier text, from which LZW beats Huffman
+MIN_MATCH_DENSITY = 0.4
+
+
+def sample(message: str, size: int = SAMPLE_SIZE, windows: int = SAMPLE_WINDOWS) -> str:
+    """Part of the message to estimate it: a few evenly spaced windows
+
+    >>> sample('abcdefgh', 4, 2)
+    'abef'
+    >>> sample('abc', 4, 2)
+    'abc'
+    """
+    if len(message) <= size:
+        return message
+
+    window = size // windows
+    step = len(message) // windows
+
+    return "".join(message[i * step : i * step + window] for i in range(windows))
+
+
+def entropy(message: str) -> float:
+    """Shannon entropy of letters (bits per letter)
+
+    >>> entropy('abab')
+    1.0
+    >>> entropy('aaaa')
+    0.0
+    """
+    length = len(message)
+    return -sum(count / length * log2(count / length)
+                for count in Counter(message).values()) + 0.0
+
+
+def match_density(message: str, match_length: int = MATCH_LENGTH) -> float:
+    """Part of positions, where next match_length letters were already seen
+
+    >>> match_density('abcdabcdabcd', 4)
+    0.5555555555555556
+    >>> match_density('abcdefgh', 4)
+    0.0
+    """
+    positions = len(message) - match_length + 1
+
+    if positions <= 0:
+        return 0.0
+
+    seen = set()
+    matches = 0
+
+    for idx in range(positions):
+        substring = message[idx : idx + match_length]
+        matches += substring in seen
+        seen.add(substring)
+
+    return matches / positions
+
+
+def lzw_size(message: str) -> float:
+    """Size of LZW code of the message in bytes: LZW parse is repeated
+    with a set of phrases (without codes) and every phrase takes as many
+    bits as the biggest code at its place, like in encode_lzw of container.py
+
+    >>> lzw_size('abababab')
+    5.375
+    """
+    alphabet_size = len(set(message))
+    phrases = set(message)
+    bits = 0
+    idx = 0
+
+    while idx < len(message):
+        length = 1
+
+        while idx + length < len(message) and message[idx : idx + length + 1] in phrases:
+            length += 1
+
+        bits += max(1, (len(phrases) - 1).bit_length())
+        phrases.add(message[idx : idx + length + 1])
+        idx += length
+
+    # initial dictionary takes about two bytes for a letter
+    return bits / 8 + 2 * alphabet_size
+
+
+def stored_size(message: str) -> int:
+    """Size of the message in a stored frame: utf-8, where letters
+    '\\udc80'-'\\udcff' (bytes that were not utf-8) take one byte each
+
+    >>> stored_size('a\\xf1\\udcff')
+    4
+    """
+    escaped = sum('\udc80' <= letter <= '\udcff' for letter in message)
+    return len(message.encode("utf-8", "surrogatepass")) - 2 * escaped
+
+
+def choose_codec(message: str) -> str:
+    """Cheapest codec that is expected to make message smaller.
+    Huffman is estimated by entropy and size of its table. When the text
+    repeats a lot, LZW is estimated too and is taken only if it saves
+    MIN_GAIN more than Huffman (it is much slower). 'stored' is used
+    when nothing saves MIN_GAIN of the size.
+
+    Args:
+        message (str): message to compress
+
+    Returns:
+        str: 'stored', 'huffman' or 'lzw'
+
+    >>> choose_codec('abacabadabacacacd' * 100)
+    'lzw'
+    >>> choose_codec(str(2 ** 1000))
+    'huffman'
+    >>> choose_codec('0123456789')
+    'stored'
+    >>> import random
+    >>> choose_codec(''.join(random.Random(1).choice('ab') for _ in range(16384)))
+    'huffman'
+    """
+    if not message:
+        return "stored"
+
+    part = sample(message)
+    alphabet_size = len(set(part))
+
+    # letters with their code lengths take about two bytes each
+    huffman_size = len(part) * entropy(part) / 8 + 2 * alphabet_size
+
+    codec, size = "stored", stored_size(part)
+
+    if huffman_size <= size * (1 - MIN_GAIN):
+        codec, size = "huffman", huffman_size
+
+    if match_density(part) >= MIN_MATCH_DENSITY and lzw_size(part) <= size * (1 - MIN_GAIN):
+        codec = "lzw"
+
+    return codec
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod())
@@ -0,0 +1,170 @@
+""" Compression of many messages at once """
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+from lz77 import LZ77
+from lzw import LZW
+from deflate import Deflate
+from cache import CachedHuffmanCoder
+from container import Container
+
+
+class BatchWorker:
+    """
+    Codec objects of one worker (process or thread). They are created once
+    and used for all messages of the worker. One Huffman coder keeps the last
+    MAX_TABLES code tables by exact letter counts (see cache.CachedHuffman),
+    for 'huffman' messages and for the entropy stage of 'deflate'. So a message
+    that repeats, or has the same letters in another order, doesn't build the
+    tree again. Other codecs have no setup to share.
+
+    >>> worker = BatchWorker()
+    >>> worker.compress('huffman', 'abacabacacabaca', {})
+    ('1001011001011011001011', {'b': '00', 'a': '1', 'c': '01'})
+    >>> _ = worker.compress('huffman', 'acabacabacabaca', {})
+    >>> _ = worker.compress('deflate', 'Hello', {})
+    >>> _ = worker.compress('deflate', 'Hello', {})
+    >>> worker.huffman.table_hits, worker.huffman.table_misses
+    (2, 2)
+    >>> worker.compress('lzw', 'abacabadabacacacd', {})
+    ([0, 1, 0, 2, 4, 0, 3, 8, 7, 12, 3], ['a', 'b', 'c', 'd'])
+    """
+    # code tables of the last messages (a table takes a few kilobytes at most)
+    MAX_TABLES = 1024
+
+    def __init__(self):
+        self.huffman = CachedHuffmanCoder(resolution=None, max_tables=self.MAX_TABLES)
+        self.lzw = LZW()
+
+    def compress(self, codec: str, message: str, params: dict):
+        """Compress one message
+
+        Returns:
+            huffman: (encoded, dictionary), lz77: list of triples,
+            lzw: (codes, initial dictionary), deflate: (encoded, dictionary),
+            container: frames (codec is in params, 'auto' by default)
+        """
+        if codec == "huffman":
+            return self.huffman.encode(message)
+
+        if codec == "lz77":
+            return LZ77.compress(message, params.get("buffer_size", 5))
+
+        if codec == "lzw":
+            return self.lzw.compress(message), self.lzw.get_initial_dictionary(message)
+
+        if codec == "deflate":
+            return Deflate.deflate_encode(message, params.get("buffer_size", 5),
+                                          return_dict=True, coder=self.huffman)
+
+        if codec == "container":
+            params = dict(params)
+            return Container.dumps(message, params.pop("codec", "auto"), **params)
+
+        raise ValueError(f"unknown codec {codec!r}")
+
+
+_local = threading.local()
+
+
+def compress_chunk(codec: str, params: dict, messages: list[str]) -> list:
+    """Compress a chunk of messages with the worker of this process/thread"""
+    worker = getattr(_local, "worker", None)
+
+    if worker is None:
+        worker = _local.worker = BatchWorker()
+
+    return [worker.compress(codec, message, params) for message in messages]
+
+
+def chunks(messages, chunksize: int):
+    """Split iterable into lists of chunksize elements
+
+    >>> list(chunks(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    iterator = iter(messages)
+
+    while True:
+        chunk = list(islice(iterator, chunksize))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def compress_batch(messages, codec: str = "deflate", workers: int = 1,
+                   executor = "process", chunksize: int = 16, **params):
+    """Compress many messages, yields results in the same order.
+    Messages are sent to workers in chunks, at most two chunks
+    for every worker are in flight, so messages can be a lazy iterable.
+
+    Args:
+        messages: iterable of str
+        codec (str): 'huffman', 'lz77', 'lzw', 'deflate' or 'container'
+        workers (int): number of workers (1 means in this thread)
+        executor: 'process', 'thread' or an Executor instance
+        chunksize (int): number of messages sent to a worker at once
+        params: codec parameters (buffer_size, codec for 'container')
+
+    >>> list(compress_batch(['abab', 'abacaba'], 'lzw'))
+    [([0, 1, 2], ['a', 'b']), ([0, 1, 0, 2, 3, 0], ['a', 'b', 'c'])]
+    >>> list(compress_batch(['abab', 'abacaba'], 'lzw', 2, 'thread', chunksize=1))
+    [([0, 1, 2], ['a', 'b']), ([0, 1, 0, 2, 3, 0], ['a', 'b', 'c'])]
+    """
+    if isinstance(executor, Executor):
+        yield from _dispatch(executor, workers, messages, codec, chunksize, params)
+        return
+
+    if workers <= 1:
+        for chunk in chunks(messages, chunksize):
+            yield from compress_chunk(codec, params, chunk)
+        return
+
+    pool = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+
+    with pool(workers) as created:
+        yield from _dispatch(created, workers, messages, codec, chunksize, params)
+
+
+def _dispatch(executor: Executor, workers: int, messages, codec: str, chunksize: int,
+              params: dict):
+    """Send chunks to executor and yield results in order"""
+    pending = deque()
+
+    for chunk in chunks(messages, chunksize):
+        pending.append(executor.submit(compress_chunk, codec, params, chunk))
+
+        if len(pending) >= 2 * workers:
+            yield from pending.popleft().result()
+
+    while pending:
+        yield from pending.popleft().result()
+
+
+def huffman_batch(messages, **kwargs):
+    """Huffman.encode (with dictionary) of many messages, see compress_batch"""
+    return compress_batch(messages, "huffman", **kwargs)
+
+
+def lz77_batch(messages, **kwargs):
+    """LZ77.compress of many messages, see compress_batch"""
+    return compress_batch(messages, "lz77", **kwargs)
+
+
+def lzw_batch(messages, **kwargs):
+    """LZW.compress (with initial dictionary) of many messages, see compress_batch"""
+    return compress_batch(messages, "lzw", **kwargs)
+
+
+def deflate_batch(messages, **kwargs):
+    """Deflate.deflate_encode (with dictionary) of many messages, see compress_batch"""
+    return compress_batch(messages, "deflate", **kwargs)
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod())
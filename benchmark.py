@@ -0,0 +1,142 @@
+""" Benchmarks of the algorithms on the bundled samples """
+import time
+from os import path
+
+from huffman import Huffman, InterleavedHuffman
+from deflate import Deflate
+from ans import RANS
+from batch import BatchWorker, compress_batch
+
+SAMPLES = [path.join(path.dirname(path.abspath(__file__)), f"sample{size}.txt")
+           for size in (1000, 5000, 10000, 50000, 100000)]
+
+
+def measure(function, *args, **kwargs) -> tuple:
+    """Call function and measure time of the call
+
+    Returns:
+        tuple: result of the function and time in seconds
+
+    >>> measure(sum, [1, 2, 3])[0]
+    6
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def read_sample(file_path: str) -> str:
+    """Content of a sample file"""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def print_table(rows: list[dict]):
+    """Print rows of a benchmark as a table
+
+    >>> print_table([{'name': 'a', 'bits': 10}, {'name': 'bc', 'bits': 7}])
+    name  bits
+    a       10
+    bc       7
+    """
+    columns = list(rows[0])
+    cells = [[f"{row[column]:.4f}" if isinstance(row[column], float) else str(row[column])
+              for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[idx]) for line in cells))
+              for idx, column in enumerate(columns)]
+
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)).rstrip())
+
+    # text to the left, numbers to the right
+    numeric = [isinstance(rows[0][column], (int, float)) for column in columns]
+
+    for line in cells:
+        print("  ".join(cell.rjust(width) if is_number else cell.ljust(width)
+                        for cell, width, is_number in zip(line, widths, numeric)).rstrip())
+
+
+class HuffmanCoder(Huffman):
+    """ Huffman from huffman.py with the interface of an entropy stage """
+    def encode(self, message: str) -> tuple[str, dict]:
+        return super().encode(message), self.get_dictionary(message)
+
+
+def compare_entropy_coders(files = None, coders = None) -> list[dict]:
+    """Ratio and speed of entropy coders alone and as the stage of Deflate
+
+    Args:
+        files (list[str]): text files (bundled samples by default)
+        coders (dict): name -> entropy coder (Huffman, 4-stream Huffman and rANS by default)
+
+    Returns:
+        list[dict]: one row for every file, stage and coder
+    """
+    files = SAMPLES if files is None else files
+    if coders is None:
+        coders = {"huffman": HuffmanCoder(), "huffman-x4": InterleavedHuffman(), "rans": RANS()}
+
+    rows = []
+
+    for file_path in files:
+        message = read_sample(file_path)
+        original_bits = len(message.encode("utf-8")) * 8
+
+        for name, coder in coders.items():
+            (encoded, table), encode_time = measure(coder.encode, message)
+            decoded, decode_time = measure(coder.decode, encoded, table)
+            assert decoded == message
+
+            rows.append({"file": path.basename(file_path), "stage": "standalone",
+                         "coder": name, "bits": len(encoded),
+                         "ratio": len(encoded) / original_bits,
+                         "encode_s": encode_time, "decode_s": decode_time})
+
+            deflate = Deflate()
+            (encoded, table), encode_time = measure(deflate.deflate_encode, message,
+                                                    return_dict=True, coder=coder)
+            decoded, decode_time = measure(deflate.deflate_decode, encoded, table,
+                                           coder=coder)
+            assert decoded == message
+
+            rows.append({"file": path.basename(file_path), "stage": "deflate",
+                         "coder": name, "bits": len(encoded),
+                         "ratio": len(encoded) / original_bits,
+                         "encode_s": encode_time, "decode_s": decode_time})
+
+    return rows
+
+
+def compare_batch_workers(codec: str = "deflate", workers = (1, 2, 4), file_path = None,
+                          message_size: int = 250, executor: str = "process",
+                          chunksize: int = 16) -> list[dict]:
+    """Items per second of compress_batch with different number of workers.
+    Messages are slices of a sample (the biggest one by default).
+
+    Returns:
+        list[dict]: one row for every number of workers
+    """
+    content = read_sample(SAMPLES[-1] if file_path is None else file_path)
+    messages = [content[idx : idx + message_size]
+                for idx in range(0, len(content), message_size)]
+
+    # baseline: new codec objects for every message
+    rows = []
+    _, loop_time = measure(lambda: [BatchWorker().compress(codec, message, {})
+                                    for message in messages])
+    rows.append({"mode": "loop", "workers": 1, "items": len(messages),
+                 "seconds": loop_time, "items_per_s": len(messages) / loop_time})
+
+    for count in workers:
+        _, batch_time = measure(lambda count=count: list(
+            compress_batch(messages, codec, count, executor, chunksize)))
+
+        rows.append({"mode": f"batch-{executor}", "workers": count, "items": len(messages),
+                     "seconds": batch_time, "items_per_s": len(messages) / batch_time})
+
+    return rows
+
+
+if __name__ == "__main__":
+    print_table(compare_entropy_coders())
+    print()
+    print_table(compare_batch_workers())
@@ -0,0 +1,361 @@
+""" Cache of compression results """
+import hashlib
+import os
+import marshal
+from collections import Counter, OrderedDict
+
+from huffman import Huffman, DICTIONARY
+
+SUFFIX = ".marshal"
+
+
+def content_key(codec: str, message, *args, **kwargs) -> str:
+    """Key of one call: hash of message plus codec name and parameters
+
+    Args:
+        codec (str): name of the codec
+        message (str | bytes): message to compress
+
+    Returns:
+        str: key (hex string)
+
+    >>> content_key('lz77', 'abacaba', 5) == content_key('lz77', 'abacaba', 5)
+    True
+    >>> content_key('lz77', 'abacaba', 5) == content_key('lz77', 'abacaba', 6)
+    False
+    """
+    if isinstance(message, str):
+        message = message.encode("utf-8", "surrogatepass")
+
+    params = repr((codec, args, sorted(kwargs.items()))).encode("utf-8")
+
+    digest = hashlib.blake2b(message, digest_size=16)
+    digest.update(params)
+
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache of compression results with a byte budget.
+    Results are kept serialized by marshal, so callers can't change cached
+    values and the budget counts real sizes. Unlike pickle, loading marshal
+    data never runs code, so a shared directory can't be used to attack
+    the process. Only plain values (str, int, None, tuple, list, dict)
+    can be cached, as all codecs return. If directory is given, every result
+    is also written there and is found again after memory eviction
+    (or by another process).
+
+    >>> cache = ResultCache(max_bytes=1024)
+    >>> from lzw import LZW
+    >>> compress = cache.wrap('lzw', LZW().compress)
+    >>> compress('abacabadabacacacd')
+    [0, 1, 0, 2, 4, 0, 3, 8, 7, 12, 3]
+    >>> compress('abacabadabacacacd')
+    [0, 1, 0, 2, 4, 0, 3, 8, 7, 12, 3]
+    >>> cache.hits, cache.misses
+    (1, 1)
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     ResultCache(directory=directory).put('key', [(0, 0, 'a')])
+    ...     other = ResultCache(directory=directory)
+    ...     other.get('key'), other.disk_hits
+    ([(0, 0, 'a')], 1)
+
+    Only files of the cache count for the disk budget and are evicted:
+
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     with open(os.path.join(directory, 'notes.txt'), 'w') as file:
+    ...         _ = file.write('x' * 100)
+    ...     os.mkdir(os.path.join(directory, 'folder'))
+    ...     cache = ResultCache(directory=directory, max_disk_bytes=50)
+    ...     cache.put('first', 'x' * 30)
+    ...     cache.put('second', 'y' * 30)
+    ...     sorted(os.listdir(directory))
+    ['folder', 'notes.txt', 'second.marshal']
+    """
+    def __init__(self, max_bytes = 64 * 1024 * 1024, directory = None,
+                 max_disk_bytes = 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+
+        self._memory = OrderedDict()
+        self._disk_size = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_size = sum(entry.stat().st_size for entry in self._disk_entries())
+
+    def get(self, key: str):
+        """Get cached value. Raises KeyError if there is no such key"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return marshal.loads(self._memory[key])
+
+        data = self._read_disk(key)
+
+        if data is None:
+            self.misses += 1
+            raise KeyError(key)
+
+        self.disk_hits += 1
+        self._put_memory(key, data)
+
+        return marshal.loads(data)
+
+    def put(self, key: str, value):
+        """Save value to the cache.
+        Raises ValueError if value is not a plain one (see class docstring)"""
+        data = marshal.dumps(value)
+
+        self._put_memory(key, data)
+        self._write_disk(key, data)
+
+    def call(self, codec: str, function, message, *args, **kwargs):
+        """Return function(message, *args, **kwargs), computing it only
+        if it is not in the cache yet"""
+        key = content_key(codec, message, *args, **kwargs)
+
+        try:
+            return self.get(key)
+        except KeyError:
+            pass
+
+        result = function(message, *args, **kwargs)
+
+        try:
+            self.put(key, result)
+        except ValueError:
+            # this result can't be serialized, so it is just not cached
+            pass
+
+        return result
+
+    def wrap(self, codec: str, function):
+        """Cached version of a codec function
+
+        Args:
+            codec (str): name of the codec (a part of the key)
+            function: function that takes message as the first argument
+
+        Returns:
+            function with the same arguments
+        """
+        def cached(message, *args, **kwargs):
+            return self.call(codec, function, message, *args, **kwargs)
+
+        cached.__doc__ = function.__doc__
+        return cached
+
+    def stats(self) -> dict:
+        """Hit/miss metrics
+
+        >>> ResultCache().stats()
+        {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'items': 0, 'bytes': 0}
+        """
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "items": len(self._memory),
+            "bytes": self.size,
+        }
+
+    def clear(self):
+        """Remove everything from memory (disk tier is not touched)"""
+        self._memory.clear()
+        self.size = 0
+
+    def _put_memory(self, key: str, data: bytes):
+        """Save serialized value to memory and evict least recently used ones"""
+        if len(data) > self.max_bytes:
+            return
+
+        if key in self._memory:
+            self.size -= len(self._memory.pop(key))
+
+        self._memory[key] = data
+        self.size += len(data)
+
+        while self.size > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{SUFFIX}")
+
+    def _disk_entries(self) -> list:
+        """Files of the disk tier (other files in the directory
+        and temporary files that are being written are skipped)"""
+        return [entry for entry in os.scandir(self.directory)
+                if entry.name.endswith(SUFFIX) and entry.is_file(follow_symlinks=False)]
+
+    def _read_disk(self, key: str):
+        if self.directory is None:
+            return None
+
+        try:
+            with open(self._path(key), 'rb') as file:
+                data = file.read()
+
+            # mark as recently used
+            os.utime(self._path(key))
+        except OSError:
+            return None
+
+        return data
+
+    def _write_disk(self, key: str, data: bytes):
+        if self.directory is None or len(data) > self.max_disk_bytes:
+            return
+
+        path = self._path(key)
+
+        if os.path.exists(path):
+            return
+
+        # write to temporary file first, so other processes never read half of it
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+        self._disk_size += len(data)
+
+        if self._disk_size > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove least recently used files until disk tier fits the budget"""
+        entries = []
+
+        for entry in self._disk_entries():
+            try:
+                entries.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+            except FileNotFoundError:
+                # removed by another process
+                continue
+
+        entries.sort()
+        self._disk_size = sum(size for _, size, _ in entries)
+
+        for _, size, file_path in entries:
+            if self._disk_size <= self.max_disk_bytes:
+                break
+
+            self._disk_size -= size
+
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+
+
+class CachedHuffman(Huffman):
+    """
+    Huffman algorithm with cached results and cached code tables.
+
+    Code tables are found by a histogram of the message. Counts are rounded
+    to `resolution` parts of the message, so messages with the same letters
+    and close frequencies reuse one tree (resolution=None means exact counts).
+
+    >>> huffman = CachedHuffman(ResultCache())
+    >>> huffman.get_dictionary('abacabacacabaca') == huffman.get_dictionary('acabacabacabaca')
+    True
+    >>> huffman.table_hits, huffman.table_misses
+    (1, 1)
+    >>> encoded = huffman.encode('abacabacacabaca')
+    >>> huffman.decode(encoded, huffman.get_dictionary('abacabacacabaca'))
+    'abacabacacabaca'
+    """
+    def __init__(self, cache: ResultCache = None, resolution = 1024, max_tables = 256):
+        self.cache = cache
+        self.resolution = resolution
+        self.max_tables = max_tables
+
+        self.table_hits = 0
+        self.table_misses = 0
+
+        self._tables = OrderedDict()
+
+    def encode(self, message: str) -> str:
+        """encode by Huffman algorithm (result is taken from the cache if it's there)"""
+        if self.cache is None:
+            return super().encode(message)
+
+        return self.cache.call(f"huffman-{self.resolution}", super().encode, message)
+
+    def histogram(self, message: str) -> tuple:
+        """Histogram of message, which is used as a key of the code table
+
+        >>> CachedHuffman(resolution=10).histogram('aaaaaaab')
+        (('a', 9), ('b', 1))
+        >>> CachedHuffman(resolution=None).histogram('aaaaaaab')
+        (('a', 7), ('b', 1))
+        """
+        counts = Counter(message)
+
+        if self.resolution is not None:
+            total = len(message)
+            counts = {letter: max(1, round(count * self.resolution / total))
+                      for letter, count in counts.items()}
+
+        return tuple(sorted(counts.items()))
+
+    def get_dictionary(self, message: str) -> DICTIONARY:
+        """dictionary of Huffman code (tree is reused for similar histograms)"""
+        key = self.histogram(message)
+
+        if key in self._tables:
+            self._tables.move_to_end(key)
+            self.table_hits += 1
+            return dict(self._tables[key])
+
+        self.table_misses += 1
+        dictionary = self.get_dictionary_from_counts(dict(key))
+
+        self._tables[key] = dictionary
+        if len(self._tables) > self.max_tables:
+            self._tables.popitem(last=False)
+
+        return dict(dictionary)
+
+
+class CachedHuffmanCoder(CachedHuffman):
+    """
+    CachedHuffman with the interface of an entropy stage of Deflate:
+    encode returns the code table too, so the histogram is counted
+    and the table is looked up once for a message.
+
+    >>> coder = CachedHuffmanCoder(resolution=None)
+    >>> coder.encode('abacabacacabaca')
+    ('1001011001011011001011', {'b': '00', 'a': '1', 'c': '01'})
+    >>> coder.decode(*coder.encode('acabacabacabaca'))
+    'acabacabacabaca'
+    >>> coder.table_hits, coder.table_misses
+    (1, 1)
+    """
+    def encode(self, message: str) -> tuple[str, DICTIONARY]:
+        """encode by Huffman algorithm
+
+        Returns:
+            tuple[str, DICTIONARY]: encoded message and its code table
+        """
+        dictionary = self.get_dictionary(message)
+        return "".join([dictionary[letter] for letter in message]), dictionary
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod())
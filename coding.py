@@ -0,0 +1,338 @@
+""" Command-line tool: python -m coding compress/decompress/bench """
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os import path
+
+from container import Container, CODECS
+from benchmark import SAMPLES, print_table
+
+SUFFIX = ".cdg"
+
+# level -> (letters in a block, buffer size of lz77 and deflate)
+LEVELS = {
+    1: (4096, 5),
+    2: (8192, 5),
+    3: (16384, 5),
+    4: (16384, 8),
+    5: (32768, 16),
+    6: (32768, 32),
+    7: (65536, 64),
+    8: (65536, 128),
+    9: (131072, 256),
+}
+DEFAULT_LEVEL = 3
+
+PROG = "python -m coding"
+
+# errors of a missing/unreadable file or corrupt input
+# (Container turns any broken frame into ValueError)
+ERRORS = (OSError, ValueError)
+
+
+def compress_stream(source, target, codec: str = "auto", level: int = DEFAULT_LEVEL) -> int:
+    """Compress text stream to binary stream block by block,
+    so memory doesn't depend on the size of the input
+
+    Args:
+        source: text file
+        target: binary file
+        codec (str): codec from container.py or 'auto'
+        level (int): 1-9, see LEVELS
+
+    Returns:
+        int: number of letters
+
+    >>> target = io.BytesIO()
+    >>> compress_stream(io.StringIO('abacaba' * 1000), target, 'lzw', level=1)
+    7000
+    >>> Container.codecs(target.getvalue())
+    ['lzw', 'lzw']
+    """
+    block_size, buffer_size = LEVELS[level]
+    letters = 0
+
+    while True:
+        block = source.read(block_size)
+
+        if not block:
+            break
+
+        # auto makes one frame of a block anyway
+        target.write(Container.dumps(block, codec, block_size=block_size,
+                                     buffer_size=buffer_size))
+        letters += len(block)
+
+    return letters
+
+
+def decompress_stream(source, target) -> int:
+    """Decompress binary stream written by compress_stream to text stream
+
+    Returns:
+        int: number of letters
+
+    >>> source = io.BytesIO(Container.dumps('abacaba', 'huffman'))
+    >>> target = io.StringIO()
+    >>> decompress_stream(source, target), target.getvalue()
+    (7, 'abacaba')
+    """
+    letters = 0
+
+    for message in Container.read_stream(source):
+        target.write(message)
+        letters += len(message)
+
+    return letters
+
+
+def open_text(file_path: str, mode: str = 'r'):
+    """Text file which keeps line endings and bytes that are not utf-8"""
+    return open(file_path, mode, encoding='utf-8', errors='surrogateescape', newline='')
+
+
+def output_path(file_path: str, directory, compress: bool) -> str:
+    """Path of the result of a file
+
+    >>> output_path('texts/a.txt', None, True)
+    'texts/a.txt.cdg'
+    >>> output_path('texts/a.txt.cdg', 'out', False)
+    'out/a.txt'
+    >>> output_path('a.bin', None, False)
+    'a.bin.out'
+    """
+    if compress:
+        name = file_path + SUFFIX
+    elif file_path.endswith(SUFFIX):
+        name = file_path[:-len(SUFFIX)]
+    else:
+        name = file_path + ".out"
+
+    if directory is not None:
+        name = path.join(directory, path.basename(name))
+
+    return name
+
+
+def process_file(file_path: str, compress: bool, codec: str, level: int,
+                 directory = None) -> dict:
+    """Compress or decompress one file (runs in a worker process with -j)
+
+    Returns:
+        dict: sizes and time of the file
+    """
+    result_path = output_path(file_path, directory, compress)
+    start = time.perf_counter()
+
+    if compress:
+        with open_text(file_path) as source, open(result_path, 'wb') as target:
+            compress_stream(source, target, codec, level)
+    else:
+        with open(file_path, 'rb') as source, open_text(result_path, 'w') as target:
+            decompress_stream(source, target)
+
+    seconds = time.perf_counter() - start
+    size_in, size_out = path.getsize(file_path), path.getsize(result_path)
+    original = size_in if compress else size_out
+
+    return {
+        "file": file_path,
+        "output": result_path,
+        "bytes_in": size_in,
+        "bytes_out": size_out,
+        "ratio": (size_out / size_in if compress else size_in / size_out) if original else 1.0,
+        "seconds": seconds,
+        "mb_per_s": original / seconds / 1e6 if seconds else 0.0,
+    }
+
+
+def report(stats: dict, stream = sys.stderr):
+    """Print result of one file"""
+    print(f"{stats['file']} -> {stats['output']}: {stats['bytes_in']} -> {stats['bytes_out']}"
+          f" bytes, ratio {stats['ratio']:.3f}, {stats['mb_per_s']:.3f} MB/s", file=stream)
+
+
+def report_error(file_path: str, error: Exception, stream = sys.stderr):
+    """Print an error of one file as 'prog: file: message'
+
+    >>> report_error('a.txt', FileNotFoundError(2, 'No such file or directory'), sys.stdout)
+    python -m coding: a.txt: No such file or directory
+    >>> report_error('stdin', ValueError('not a compressed frame'), sys.stdout)
+    python -m coding: stdin: not a compressed frame
+    """
+    message = error.strerror if isinstance(error, OSError) and error.strerror else error
+    print(f"{PROG}: {file_path}: {message}", file=stream)
+
+
+def process_files(files: list[str], compress: bool, codec: str, level: int,
+                  jobs: int = 1, directory = None) -> list[dict]:
+    """Compress or decompress many files, with jobs processes at once.
+    A file that fails is reported and skipped, the others are processed anyway.
+
+    Returns:
+        list[dict]: stats of files that succeeded, in the order of files
+    """
+    if jobs <= 1:
+        results = []
+
+        for file_path in files:
+            try:
+                results.append(process_file(file_path, compress, codec, level, directory))
+            except ERRORS as error:
+                report_error(file_path, error)
+            else:
+                report(results[-1])
+
+        return results
+
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = {executor.submit(process_file, file_path, compress, codec, level, directory):
+                   file_path for file_path in files}
+
+        # print files as soon as they are ready
+        for future in as_completed(futures):
+            try:
+                report(future.result())
+            except ERRORS as error:
+                report_error(futures[future], error)
+
+        return [future.result() for future in futures if future.exception() is None]
+
+
+def bench(files: list[str], codecs: list[str], level: int) -> list[dict]:
+    """Ratio and throughput of codecs on files
+
+    Returns:
+        list[dict]: one row for every file and codec
+    """
+    rows = []
+
+    for file_path in files:
+        with open_text(file_path) as file:
+            content = file.read()
+
+        size = len(content.encode('utf-8', 'surrogateescape'))
+
+        for codec in codecs:
+            compressed = io.BytesIO()
+
+            start = time.perf_counter()
+            compress_stream(io.StringIO(content), compressed, codec, level)
+            compress_time = time.perf_counter() - start
+
+            compressed.seek(0)
+            decompressed = io.StringIO()
+
+            start = time.perf_counter()
+            decompress_stream(compressed, decompressed)
+            decompress_time = time.perf_counter() - start
+
+            assert decompressed.getvalue() == content
+
+            rows.append({
+                "file": path.basename(file_path),
+                "codec": codec,
+                "bytes": size,
+                "compressed": len(compressed.getvalue()),
+                "ratio": len(compressed.getvalue()) / size if size else 1.0,
+                "compress_mb_s": size / compress_time / 1e6 if compress_time else 0.0,
+                "decompress_mb_s": size / decompress_time / 1e6 if decompress_time else 0.0,
+            })
+
+    return rows
+
+
+def parse_args(args = None) -> argparse.Namespace:
+    """Arguments of the command line
+
+    >>> parse_args(['compress', '-c', 'lzw', '-l', '5', '-j', '2', 'a.txt']).jobs
+    2
+    """
+    parser = argparse.ArgumentParser(prog=PROG,
+                                     description="Compress text with Huffman, LZ77, LZW, DEFLATE")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    codecs = [*CODECS, "auto"]
+
+    compress = commands.add_parser("compress", help="compress files or stdin to stdout")
+    compress.add_argument("-c", "--codec", choices=codecs, default="auto")
+
+    decompress = commands.add_parser("decompress", help="decompress files or stdin to stdout")
+
+    for command in (compress, decompress):
+        command.add_argument("files", nargs="*",
+                             help="files (stdin to stdout if there are none or '-')")
+        command.add_argument("-j", "--jobs", type=int, default=1,
+                             help="number of files processed at once")
+        command.add_argument("-o", "--output-dir", default=None,
+                             help="directory for results (next to files by default)")
+
+    benchmark = commands.add_parser("bench", help="ratio and throughput of codecs")
+    benchmark.add_argument("files", nargs="*", help="text files (bundled samples by default)")
+    benchmark.add_argument("-c", "--codec", action="append", choices=codecs,
+                           help="codec to check (can be repeated, all by default)")
+
+    for command in (compress, decompress, benchmark):
+        command.add_argument("-l", "--level", type=int, choices=range(1, 10),
+                             default=DEFAULT_LEVEL, help="1 (fast) - 9 (small)")
+
+    return parser.parse_args(args)
+
+
+def main(args = None) -> int:
+    """Entry point of the command line
+
+    Returns:
+        int: exit status, 1 if any file failed
+    """
+    arguments = parse_args(args)
+
+    if arguments.command == "bench":
+        codecs = arguments.codec or [*CODECS, "auto"]
+
+        try:
+            print_table(bench(arguments.files or SAMPLES, codecs, arguments.level))
+        except OSError as error:
+            report_error(error.filename, error)
+            return 1
+
+        return 0
+
+    compress = arguments.command == "compress"
+    codec = arguments.codec if compress else None
+
+    if not arguments.files or arguments.files == ["-"]:
+        try:
+            if compress:
+                source = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8',
+                                          errors='surrogateescape', newline='')
+                compress_stream(source, sys.stdout.buffer, codec, arguments.level)
+            else:
+                target = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8',
+                                          errors='surrogateescape', newline='')
+                decompress_stream(sys.stdin.buffer, target)
+                target.flush()
+        except ERRORS as error:
+            report_error("stdin", error)
+            return 1
+
+        return 0
+
+    if arguments.output_dir is not None:
+        try:
+            os.makedirs(arguments.output_dir, exist_ok=True)
+        except OSError as error:
+            report_error(arguments.output_dir, error)
+            return 1
+
+    results = process_files(arguments.files, compress, codec, arguments.level,
+                            arguments.jobs, arguments.output_dir)
+
+    return 0 if len(results) == len(arguments.files) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,595 @@
+""" Self-describing binary container for compressed messages """
+import zlib
+from math import ceil
+
+from huffman import Huffman
+from lz77 import LZ77
+from lzw import LZW
+import deflate
+from auto import choose_codec
+
+MAGIC = b'\xc0\xde'
+VERSION = 1
+
+FLAG_CHECKSUM = 1
+
+BLOCK_SIZE = 16384
+
+CODEC_IDS = {
+    "stored": 0,
+    "huffman": 1,
+    "lz77": 2,
+    "lzw": 3,
+    "deflate": 4,
+}
+CODEC_NAMES = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+
+
+def write_varint(result: bytearray, number: int):
+    """Append unsigned int to result (7 bits in a byte, high bit means 'more bytes')
+
+    >>> result = bytearray()
+    >>> write_varint(result, 300)
+    >>> bytes(result)
+    b'\\xac\\x02'
+    """
+    while number >= 0x80:
+        result.append(number & 0x7f | 0x80)
+        number >>= 7
+
+    result.append(number)
+
+
+def read_varint(data: bytes, idx: int) -> tuple[int, int]:
+    """Read unsigned int written by write_varint
+
+    Returns:
+        tuple[int, int]: number and index of the next byte
+
+    >>> read_varint(b'\\xac\\x02', 0)
+    (300, 2)
+    """
+    number = 0
+    shift = 0
+
+    while True:
+        if idx >= len(data):
+            raise ValueError("unexpected end of data")
+
+        byte = data[idx]
+        idx += 1
+        number |= (byte & 0x7f) << shift
+        shift += 7
+
+        if byte < 0x80:
+            return number, idx
+
+
+def pack_bits(bits: str) -> bytes:
+    """'0' and '1' string to bytes (last byte is padded with zeros)
+
+    >>> pack_bits('1000000001')
+    b'\\x80@'
+    """
+    if not bits:
+        return b''
+
+    length = ceil(len(bits) / 8)
+    return int(bits.ljust(length * 8, '0'), 2).to_bytes(length, 'big')
+
+
+def unpack_bits(data: bytes, bits_count: int) -> str:
+    """Inverse of pack_bits
+
+    >>> unpack_bits(b'\\x80@', 10)
+    '1000000001'
+    """
+    if not bits_count:
+        return ''
+
+    return format(int.from_bytes(data, 'big'), f'0{len(data) * 8}b')[:bits_count]
+
+
+def canonical_codes(lengths: dict) -> dict:
+    """Canonical Huffman codes for code lengths.
+    Only lengths are stored in the container, the codes are restored from them.
+
+    Args:
+        lengths (dict): symbol -> length of its code
+
+    Returns:
+        dict: symbol -> code
+
+    >>> canonical_codes({'b': 2, 'a': 1, 'c': 2})
+    {'a': '0', 'b': '10', 'c': '11'}
+    """
+    result = {}
+    code = 0
+    previous = 0
+
+    for symbol, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+        code <<= length - previous
+        result[symbol] = format(code, f'0{length}b')
+        code += 1
+        previous = length
+
+    return result
+
+
+def write_alphabet(result: bytearray, alphabet):
+    """Write sorted ints as differences between neighbours"""
+    write_varint(result, len(alphabet))
+
+    previous = 0
+    for symbol in alphabet:
+        write_varint(result, symbol - previous)
+        previous = symbol
+
+
+def read_alphabet(data: bytes, idx: int) -> tuple[list[int], int]:
+    """Read ints written by write_alphabet"""
+    count, idx = read_varint(data, idx)
+    alphabet = []
+
+    previous = 0
+    for _ in range(count):
+        difference, idx = read_varint(data, idx)
+        previous += difference
+        alphabet.append(previous)
+
+    return alphabet, idx
+
+
+def write_huffman(result: bytearray, symbols: list[int]):
+    """Huffman code of a sequence of ints: alphabet, code lengths and bits"""
+    if not symbols:
+        write_alphabet(result, [])
+        return
+
+    dictionary = Huffman().get_dictionary(symbols)
+    alphabet = sorted(dictionary)
+    codes = canonical_codes({symbol: len(dictionary[symbol]) for symbol in alphabet})
+
+    write_alphabet(result, alphabet)
+    result.extend(len(codes[symbol]) for symbol in alphabet)
+
+    bits = "".join([codes[symbol] for symbol in symbols])
+    write_varint(result, len(bits))
+    result.extend(pack_bits(bits))
+
+
+def read_huffman(data: bytes, idx: int) -> tuple[list[int], int]:
+    """Read ints written by write_huffman"""
+    alphabet, idx = read_alphabet(data, idx)
+
+    if not alphabet:
+        return [], idx
+
+    lengths = dict(zip(alphabet, data[idx : idx + len(alphabet)]))
+    idx += len(alphabet)
+
+    bits_count, idx = read_varint(data, idx)
+    end = idx + ceil(bits_count / 8)
+    bits = unpack_bits(data[idx : end], bits_count)
+
+    reverse = {code: symbol for symbol, code in canonical_codes(lengths).items()}
+    symbols = []
+    code = ''
+
+    for bit in bits:
+        code += bit
+
+        if code in reverse:
+            symbols.append(reverse[code])
+            code = ''
+
+    if code:
+        raise ValueError("huffman stream ends in the middle of a code")
+
+    return symbols, end
+
+
+def write_lz77(result: bytearray, encoded: list[tuple]):
+    """Write triples <offset, length, next> (next is ord + 1, 0 is None)"""
+    write_varint(result, len(encoded))
+
+    for offset, length, next_sym in encoded:
+        write_varint(result, offset)
+        write_varint(result, length)
+        write_varint(result, 0 if next_sym is None else ord(next_sym) + 1)
+
+
+def read_lz77(data: bytes, idx: int) -> tuple[list[tuple], int]:
+    """Read triples written by write_lz77"""
+    count, idx = read_varint(data, idx)
+    encoded = []
+
+    for _ in range(count):
+        offset, idx = read_varint(data, idx)
+        length, idx = read_varint(data, idx)
+        next_sym, idx = read_varint(data, idx)
+        encoded.append((offset, length, chr(next_sym - 1) if next_sym else None))
+
+    return encoded, idx
+
+
+def encode_stored(message: str, params: dict) -> bytes:
+    """Stored body: message as it is (utf-8). Letters '\\udc80'-'\\udcff' are bytes
+    that were not utf-8 (read with errors='surrogateescape'), so they are written
+    back as these bytes. Text that can't be restored from them (other surrogates)
+    is written with 'surrogatepass'.
+
+    >>> encode_stored('a\\udcff', {}), encode_stored('a\\ud800', {})
+    (b'a\\xff', b'a\\xed\\xa0\\x80')
+    """
+    try:
+        data = message.encode("utf-8", "surrogateescape")
+
+        if decode_stored(data) == message:
+            return data
+    except UnicodeEncodeError:
+        pass
+
+    return message.encode("utf-8", "surrogatepass")
+
+
+def decode_stored(data: bytes) -> str:
+    """Inverse of encode_stored"""
+    try:
+        return data.decode("utf-8", "surrogatepass")
+    except UnicodeDecodeError:
+        return data.decode("utf-8", "surrogateescape")
+
+
+def encode_huffman(message: str, params: dict) -> bytearray:
+    """Huffman body: canonical code lengths of letters and bits"""
+    result = bytearray()
+    write_huffman(result, [ord(letter) for letter in message])
+    return result
+
+
+def decode_huffman(data: bytes) -> str:
+    """Inverse of encode_huffman"""
+    symbols, _ = read_huffman(data, 0)
+    return "".join(map(chr, symbols))
+
+
+def encode_lz77(message: str, params: dict) -> bytearray:
+    """LZ77 body: buffer size and triples"""
+    buffer_size = params.get("buffer_size", 5)
+
+    result = bytearray()
+    write_varint(result, buffer_size)
+    write_lz77(result, LZ77.compress(message, buffer_size))
+
+    return result
+
+
+def decode_lz77(data: bytes) -> str:
+    """Inverse of encode_lz77"""
+    buffer_size, idx = read_varint(data, 0)
+    encoded, _ = read_lz77(data, idx)
+    return LZ77.decompress(encoded, buffer_size)
+
+
+def encode_lzw(message: str, params: dict) -> bytearray:
+    """LZW body: initial dictionary and codes. Every code takes as many
+    bits as the biggest code possible at its place."""
+    lzw = LZW()
+    alphabet = lzw.get_initial_dictionary(message)
+    codes = lzw.compress(message) if message else []
+
+    result = bytearray()
+    write_alphabet(result, [ord(letter) for letter in alphabet])
+    write_varint(result, len(codes))
+
+    bits = "".join([format(code, f'0{max(1, (len(alphabet) + idx - 1).bit_length())}b')
+                    for idx, code in enumerate(codes)])
+    result.extend(pack_bits(bits))
+
+    return result
+
+
+def decode_lzw(data: bytes) -> str:
+    """Inverse of encode_lzw"""
+    alphabet, idx = read_alphabet(data, 0)
+    count, idx = read_varint(data, idx)
+
+    bits = unpack_bits(data[idx:], (len(data) - idx) * 8)
+    codes = []
+    position = 0
+
+    for code_idx in range(count):
+        width = max(1, (len(alphabet) + code_idx - 1).bit_length())
+        codes.append(int(bits[position : position + width], 2))
+        position += width
+
+    return LZW.decompress(codes, [chr(symbol) for symbol in alphabet])
+
+
+def encode_deflate(message: str, params: dict) -> bytearray:
+    """DEFLATE body: LZ77 triples, where offsets and lengths are coded
+    by one Huffman code and next letters by another one"""
+    buffer_size = params.get("buffer_size", 5)
+    encoded = deflate.LZ77.compress(message, buffer_size)
+
+    numbers = []
+    letters = []
+
+    for offset, length, next_sym in encoded:
+        numbers.extend((offset, length))
+        letters.append(0 if next_sym is None else ord(next_sym) + 1)
+
+    result = bytearray()
+    write_varint(result, buffer_size)
+    write_huffman(result, numbers)
+    write_huffman(result, letters)
+
+    return result
+
+
+def decode_deflate(data: bytes) -> str:
+    """Inverse of encode_deflate"""
+    buffer_size, idx = read_varint(data, 0)
+    numbers, idx = read_huffman(data, idx)
+    letters, idx = read_huffman(data, idx)
+
+    encoded = [(numbers[2 * i], numbers[2 * i + 1], chr(letter - 1) if letter else None)
+               for i, letter in enumerate(letters)]
+
+    return deflate.LZ77.decompress(encoded, buffer_size)
+
+
+CODECS = {
+    "stored": (encode_stored, decode_stored),
+    "huffman": (encode_huffman, decode_huffman),
+    "lz77": (encode_lz77, decode_lz77),
+    "lzw": (encode_lzw, decode_lzw),
+    "deflate": (encode_deflate, decode_deflate),
+}
+
+
+def message_checksum(message: str) -> bytes:
+    """crc32 of the message"""
+    return zlib.crc32(message.encode("utf-8", "surrogatepass")).to_bytes(4, 'big')
+
+
+class Container:
+    """
+    Frames with compressed messages, which can be decoded without anything else.
+
+    Frame: magic (2 bytes), version and flags (1 byte), codec id (1 byte),
+    length of the body (varint), body (parameters, tables and payload of the codec)
+    and crc32 of the original message (4 bytes, optional).
+    Frames can be concatenated, loads decodes all of them.
+
+    >>> frame = Container.dumps('abacabadabacacacd', 'lzw')
+    >>> len(frame)
+    20
+    >>> Container.loads(frame)
+    'abacabadabacacacd'
+    >>> Container.loads(frame + Container.dumps('Hello', 'deflate', checksum=False))
+    'abacabadabacacacdHello'
+    >>> Container.loads(frame[:-1] + b'?')
+    Traceback (most recent call last):
+    ...
+    ValueError: checksum mismatch
+    """
+    @classmethod
+    def dumps(cls, message: str, codec: str = "deflate", checksum = True,
+              block_size: int = BLOCK_SIZE, **params) -> bytes:
+        """Compress message to one frame.
+        With codec='auto' message is split into blocks of block_size letters
+        and every block gets a frame with its own codec (see auto.py).
+        A block is stored as it is, if the chosen codec doesn't make it smaller.
+
+        Args:
+            message (str): message to compress
+            codec (str): 'stored', 'huffman', 'lz77', 'lzw', 'deflate' or 'auto'
+            checksum (bool): add crc32 of the message
+            block_size (int): size of a block for 'auto'
+            params: codec parameters (buffer_size for lz77 and deflate)
+
+        Returns:
+            bytes: frame (frames for 'auto')
+
+        >>> Container.dumps('aab', 'huffman', checksum=False)
+        b'\\xc0\\xde\\x10\\x01\\x07\\x02a\\x01\\x01\\x01\\x03 '
+        >>> frames = Container.dumps('abacabadabacacacd' * 100 + str(2 ** 1000), 'auto',
+        ...                          block_size=1700)
+        >>> Container.codecs(frames)
+        ['lzw', 'huffman']
+
+        Bytes that are not text (read with errors='surrogateescape') are stored
+        as they are, so they grow only by the frame headers:
+
+        >>> import random
+        >>> data = random.Random(1).randbytes(20000)
+        >>> frames = Container.dumps(data.decode('utf-8', 'surrogateescape'), 'auto')
+        >>> Container.codecs(frames), len(frames) - len(data)
+        (['stored', 'stored'], 21)
+        """
+        if codec == "auto":
+            blocks = [message[idx : idx + block_size]
+                      for idx in range(0, len(message), block_size)] or [""]
+
+            return b"".join(cls._auto_frame(block, checksum, params) for block in blocks)
+
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec {codec!r}")
+
+        encode, _ = CODECS[codec]
+        body = encode(message, params)
+
+        result = bytearray(MAGIC)
+        result.append(VERSION << 4 | (FLAG_CHECKSUM if checksum else 0))
+        result.append(CODEC_IDS[codec])
+        write_varint(result, len(body))
+        result.extend(body)
+
+        if checksum:
+            result.extend(message_checksum(message))
+
+        return bytes(result)
+
+    @classmethod
+    def _auto_frame(cls, block: str, checksum: bool, params: dict) -> bytes:
+        """Frame of one block with automatically chosen codec"""
+        codec = choose_codec(block)
+        frame = cls.dumps(block, codec, checksum, **params)
+
+        if codec != "stored":
+            stored = cls.dumps(block, "stored", checksum)
+
+            if len(stored) <= len(frame):
+                return stored
+
+        return frame
+
+    @staticmethod
+    def codecs(data: bytes) -> list[str]:
+        """Codecs of all frames (frames are not decoded)
+
+        >>> Container.codecs(Container.dumps('abc', 'stored') + Container.dumps('abc', 'lz77'))
+        ['stored', 'lz77']
+        """
+        result = []
+        idx = 0
+
+        while idx < len(data):
+            if data[idx : idx + 2] != MAGIC or len(data) < idx + 4:
+                raise ValueError("not a compressed frame")
+
+            flags = data[idx + 2] & 0x0f
+            result.append(CODEC_NAMES.get(data[idx + 3]))
+
+            length, idx = read_varint(data, idx + 4)
+            idx += length + (4 if flags & FLAG_CHECKSUM else 0)
+
+        return result
+
+    @staticmethod
+    def read_frame(data: bytes, idx: int = 0) -> tuple[str, int]:
+        """Decode one frame
+
+        Args:
+            data (bytes): frames
+            idx (int): index of the first byte of the frame
+
+        Returns:
+            tuple[str, int]: decoded message and index of the next frame
+
+        Raises ValueError for any broken frame
+
+        >>> Container.read_frame(b'\\xc0\\xde\\x10\\x02\\x05\\x05\\x01\\x00\\x02\\x00')
+        Traceback (most recent call last):
+        ...
+        ValueError: corrupt frame: ZeroDivisionError: division by zero
+        """
+        if data[idx : idx + 2] != MAGIC:
+            raise ValueError("not a compressed frame")
+
+        if len(data) < idx + 4:
+            raise ValueError("unexpected end of data")
+
+        version, flags = data[idx + 2] >> 4, data[idx + 2] & 0x0f
+        codec = CODEC_NAMES.get(data[idx + 3])
+
+        if version != VERSION:
+            raise ValueError(f"unsupported version {version}")
+
+        if codec is None:
+            raise ValueError(f"unknown codec id {data[idx + 3]}")
+
+        length, idx = read_varint(data, idx + 4)
+        body = data[idx : idx + length]
+        idx += length
+
+        if len(body) != length:
+            raise ValueError("unexpected end of data")
+
+        _, decode = CODECS[codec]
+
+        # a broken body can fail anywhere inside a codec (lookups, chr, division)
+        try:
+            message = decode(body)
+        except Exception as error:
+            raise ValueError(f"corrupt frame: {type(error).__name__}: {error}") from error
+
+        if flags & FLAG_CHECKSUM:
+            if data[idx : idx + 4] != message_checksum(message):
+                raise ValueError("checksum mismatch")
+            idx += 4
+
+        return message, idx
+
+    @classmethod
+    def loads(cls, data: bytes) -> str:
+        """Decode all frames and join them"""
+        result = []
+        idx = 0
+
+        while idx < len(data):
+            message, idx = cls.read_frame(data, idx)
+            result.append(message)
+
+        return "".join(result)
+
+    @classmethod
+    def read_stream(cls, file):
+        """Decode frames from a binary file one by one, so only one frame
+        is in memory at a time
+
+        Yields:
+            str: decoded message of every frame
+
+        >>> import io
+        >>> stream = io.BytesIO(Container.dumps('abacaba', 'lzw') + Container.dumps('!', 'stored'))
+        >>> list(Container.read_stream(stream))
+        ['abacaba', '!']
+        """
+        while True:
+            frame = bytearray(file.read(4))
+
+            if not frame:
+                return
+
+            if len(frame) < 4 or frame[:2] != MAGIC:
+                raise ValueError("not a compressed frame")
+
+            # varint with the length of the body
+            while True:
+                byte = file.read(1)
+
+                if not byte:
+                    raise ValueError("unexpected end of data")
+
+                frame += byte
+                if byte[0] < 0x80:
+                    break
+
+            length, _ = read_varint(frame, 4)
+            frame += file.read(length + (4 if frame[2] & FLAG_CHECKSUM else 0))
+
+            message, _ = cls.read_frame(bytes(frame))
+            yield message
+
+    @classmethod
+    def write_file(cls, file_path: str, output_path: str, codec: str = "deflate", **params):
+        """Compress text file to a file with one frame"""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+
+        with open(output_path, 'wb') as file:
+            file.write(cls.dumps(content, codec, **params))
+
+    @classmethod
+    def read_file(cls, file_path: str) -> str:
+        """Decode file written by write_file"""
+        with open(file_path, 'rb') as file:
+            return cls.loads(file.read())
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod())
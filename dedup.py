@@ -0,0 +1,309 @@
+""" Content-defined chunking and deduplication of many files """
+import hashlib
+import random
+from os import path
+
+from container import Container, write_varint, read_varint
+
+MAGIC = b'\xc0\xdd'
+
+# the same table in every run, otherwise chunks of the same text differ
+_GEAR_RANDOM = random.Random(2023)
+GEAR = [_GEAR_RANDOM.getrandbits(64) for _ in range(256)]
+MASK_64 = (1 << 64) - 1
+
+
+def chunk_boundaries(message: str, average: int = 2048, minimum: int = 512,
+                     maximum: int = 8192) -> list[int]:
+    """Ends of content-defined chunks.
+    Gear rolling hash is updated by every letter, a chunk ends where
+    its high bits are zero. So a boundary depends only on the letters
+    just before it, and an insertion changes only the chunks near it.
+
+    Args:
+        message (str): message to split
+        average (int): expected size of a chunk (power of two)
+        minimum (int): smallest chunk (but the last one)
+        maximum (int): biggest chunk
+
+    Returns:
+        list[int]: end of every chunk (the last one is len(message))
+
+    >>> chunk_boundaries('abc' * 10, average=4, minimum=2, maximum=8)[-1]
+    30
+    >>> text = str(3 ** 2000)
+    >>> first = chunk_boundaries(text, 32, 8, 256)
+    >>> second = chunk_boundaries('Hello! ' + text, 32, 8, 256)
+    >>> first[1:] == [end - 7 for end in second[3:]]
+    True
+    """
+    # high bits depend on the last 64 letters, low ones only on a few last letters
+    shift = 64 - (average.bit_length() - 1)
+    boundaries = []
+    start = 0
+    rolling = 0
+
+    for idx, letter in enumerate(message):
+        rolling = ((rolling << 1) + GEAR[ord(letter) & 0xff]) & MASK_64
+        length = idx + 1 - start
+
+        if length >= maximum or (length >= minimum and not rolling >> shift):
+            boundaries.append(idx + 1)
+            start = idx + 1
+            rolling = 0
+
+    if start < len(message):
+        boundaries.append(len(message))
+
+    return boundaries
+
+
+def split_chunks(message: str, average: int = 2048, minimum: int = 512,
+                 maximum: int = 8192) -> list[str]:
+    """Split message into content-defined chunks (see chunk_boundaries)
+
+    >>> ''.join(split_chunks('abacaba' * 100, 16, 4, 64)) == 'abacaba' * 100
+    True
+    """
+    start = 0
+    chunks = []
+
+    for end in chunk_boundaries(message, average, minimum, maximum):
+        chunks.append(message[start : end])
+        start = end
+
+    return chunks
+
+
+class ChunkStore:
+    """
+    Unique chunks: every chunk gets an id, the same chunk gets the same id.
+
+    >>> store = ChunkStore()
+    >>> store.add('abc'), store.add('def'), store.add('abc')
+    (0, 1, 0)
+    >>> store.chunks
+    ['abc', 'def']
+    """
+    def __init__(self):
+        self.chunks = []
+        self._ids = {}
+
+    def add(self, chunk: str) -> int:
+        """id of the chunk (a new one if it is not in the store yet)"""
+        digest = hashlib.blake2b(chunk.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+        if digest not in self._ids:
+            self._ids[digest] = len(self.chunks)
+            self.chunks.append(chunk)
+
+        return self._ids[digest]
+
+
+def write_references(result: bytearray, references: list[int]):
+    """Write chunk ids as runs <first id, length>: new chunks of a file
+    get consecutive ids, so a file without repeats takes one run
+
+    >>> result = bytearray()
+    >>> write_references(result, [0, 1, 2, 3, 1, 2])
+    >>> bytes(result)
+    b'\\x02\\x00\\x04\\x01\\x02'
+    """
+    runs = []
+
+    for reference in references:
+        if runs and runs[-1][0] + runs[-1][1] == reference:
+            runs[-1][1] += 1
+        else:
+            runs.append([reference, 1])
+
+    write_varint(result, len(runs))
+
+    for first, length in runs:
+        write_varint(result, first)
+        write_varint(result, length)
+
+
+def read_references(data: bytes, idx: int) -> tuple[list[int], int]:
+    """Read chunk ids written by write_references"""
+    count, idx = read_varint(data, idx)
+    references = []
+
+    for _ in range(count):
+        first, idx = read_varint(data, idx)
+        length, idx = read_varint(data, idx)
+        references.extend(range(first, first + length))
+
+    return references, idx
+
+
+class Deduplicator:
+    """
+    Batch of files, which are split into content-defined chunks.
+    Only unique chunks are compressed (by a codec of container.py),
+    files keep lists of chunk ids.
+
+    Archive: magic (2 bytes), number of chunks, every chunk as its length
+    and container frames, number of files, every file as its name
+    and runs of chunk ids (all numbers are varints).
+
+    >>> text = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 40
+    >>> deduplicator = Deduplicator('huffman', average=64, minimum=16, maximum=256)
+    >>> deduplicator.add('first.txt', text)
+    >>> deduplicator.add('second.txt', 'Hello! ' + text)
+    >>> stats = deduplicator.stats()
+    >>> stats['unique_letters'] < stats['letters'] // 2
+    True
+    >>> files = Deduplicator.loads(deduplicator.dumps())
+    >>> files['second.txt'] == 'Hello! ' + text
+    True
+    """
+    def __init__(self, codec: str = "deflate", average: int = 2048, minimum: int = 512,
+                 maximum: int = 8192, **params):
+        self.codec = codec
+        self.params = params
+        self.chunking = (average, minimum, maximum)
+
+        self.store = ChunkStore()
+        self.files = {}
+
+    def add(self, name: str, content: str):
+        """Split content into chunks and add them to the store.
+        Raises ValueError if there already is a file with this name
+
+        >>> deduplicator = Deduplicator()
+        >>> deduplicator.add('x.txt', 'first')
+        >>> deduplicator.add('x.txt', 'second')
+        Traceback (most recent call last):
+        ...
+        ValueError: file 'x.txt' is already added
+        """
+        if name in self.files:
+            raise ValueError(f"file {name!r} is already added")
+
+        self.files[name] = [self.store.add(chunk)
+                            for chunk in split_chunks(content, *self.chunking)]
+
+    def add_file(self, file_path: str, name = None):
+        """Add content of a text file (named by its base name by default,
+        so files with the same base name need different names)"""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            self.add(path.basename(file_path) if name is None else name, file.read())
+
+    def stats(self) -> dict:
+        """Sizes before and after deduplication"""
+        sizes = [len(chunk) for chunk in self.store.chunks]
+
+        return {
+            "files": len(self.files),
+            "chunks": sum(len(references) for references in self.files.values()),
+            "unique_chunks": len(sizes),
+            "letters": sum(sizes[idx] for refs in self.files.values() for idx in refs),
+            "unique_letters": sum(sizes),
+        }
+
+    def dumps(self) -> bytes:
+        """Archive of all added files"""
+        result = bytearray(MAGIC)
+        write_varint(result, len(self.store.chunks))
+
+        for chunk in self.store.chunks:
+            frames = Container.dumps(chunk, self.codec, checksum=False, **self.params)
+            write_varint(result, len(frames))
+            result.extend(frames)
+
+        write_varint(result, len(self.files))
+
+        for name, references in self.files.items():
+            encoded_name = name.encode("utf-8")
+            write_varint(result, len(encoded_name))
+            result.extend(encoded_name)
+            write_references(result, references)
+
+        return bytes(result)
+
+    @staticmethod
+    def loads(data: bytes) -> dict[str, str]:
+        """Files of an archive
+
+        Returns:
+            dict[str, str]: name -> content
+        """
+        if data[:2] != MAGIC:
+            raise ValueError("not a deduplicated archive")
+
+        count, idx = read_varint(data, 2)
+        chunks = []
+
+        for _ in range(count):
+            length, idx = read_varint(data, idx)
+            chunks.append(Container.loads(data[idx : idx + length]))
+            idx += length
+
+        count, idx = read_varint(data, idx)
+        files = {}
+
+        for _ in range(count):
+            length, idx = read_varint(data, idx)
+            name = data[idx : idx + length].decode("utf-8")
+            references, idx = read_references(data, idx + length)
+            files[name] = "".join(chunks[reference] for reference in references)
+
+        return files
+
+    @classmethod
+    def compress_files(cls, file_paths: list[str], output_path: str,
+                       codec: str = "deflate", **params) -> dict:
+        """Compress text files into one archive.
+        Files are named by base names, which must be different:
+        ValueError is raised before anything is written otherwise.
+
+        Returns:
+            dict: stats of deduplication
+        """
+        names = {}
+
+        for file_path in file_paths:
+            name = path.basename(file_path)
+
+            if name in names:
+                raise ValueError(f"{names[name]} and {file_path} have the same name {name!r}")
+
+            names[name] = file_path
+
+        deduplicator = cls(codec, **params)
+
+        for file_path in file_paths:
+            deduplicator.add_file(file_path)
+
+        with open(output_path, 'wb') as file:
+            file.write(deduplicator.dumps())
+
+        return deduplicator.stats()
+
+    @classmethod
+    def decompress_file(cls, archive_path: str, directory: str = ".") -> list[str]:
+        """Write all files of an archive to directory
+
+        Returns:
+            list[str]: paths of written files
+        """
+        with open(archive_path, 'rb') as file:
+            files = cls.loads(file.read())
+
+        written = []
+
+        for name, content in files.items():
+            file_path = path.join(directory, path.basename(name))
+
+            with open(file_path, 'w', encoding='utf-8') as file:
+                file.write(content)
+
+            written.append(file_path)
+
+        return written
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod())
@@ -27,59 +27,41 @@ class LZ77:
         >>> lz77 = LZ77()
         >>> lz77.compress('abacabacabadaca')
         [(0, 0, 'a'), (0, 0, 'b'), (2, 1, 'c'), (4, 7, 'd'), (2, 1, 'c'), (2, 1, None)]
+        >>> lz77.decompress(lz77.compress('adacddcaaaadcdccdcddadcbdbabccbcdccdcdcd'))
+        'adacddcaaaadcdccdcddadcbdbabccbcdccdcdcd'
         """
         if not all([isinstance(message, str), isinstance(buffer_size, int)]):
             return None
 
         result = []
-        buffer = ''
         ind = 0
 
         while ind < len(message):
-            start = ind
-            copy_buff = buffer
+            # the decoder sees only the last buffer_size letters
+            buffer = message[max(0, ind - buffer_size) : ind]
+            offset, length = 0, 0
 
-            while message[start : ind + 1] in buffer and ind != len(message):
-                ind += 1
+            # a match can run past the end of the buffer: it goes on from the
+            # start of the buffer again, like buffer * n in decompress.
+            # The nearest match is checked first, farther ones must be longer
+            start = buffer.rfind(message[ind])
 
-                if message[start : ind + 1] not in buffer:
-                    buffer *= 2
+            while start != -1:
+                size = 1
 
-            ext_buff = buffer
-            buffer = copy_buff
-            i = ind + 1
+                while (ind + size < len(message)
+                       and message[ind + size] == buffer[(start + size) % len(buffer)]):
+                    size += 1
 
-            # finding offset
-            substr = message[start : i]
-            copy_substr = substr[:-1]
+                if size > length:
+                    offset, length = len(buffer) - start, size
 
-            while substr not in buffer:
-                i -= 1
-                substr = message[start : i]
+                start = buffer.rfind(message[ind], 0, start)
 
-            offset = 0 if len(substr) == 0 else buffer.rfind(substr)
-
-            if len(substr) != 0:
-                offset = len(buffer) - offset
-
-            if offset != 0:
-                while copy_substr != ext_buff[
-                    len(buffer) - offset : len(buffer) - offset + len(copy_substr)]:
-                    offset -= 1
-
-            # getting the next symbol
-            if len(message[start : ind + 1]) == ind - start:
-                next_sym = None
-            else:
-                next_sym = message[start : ind + 1][-1]
-
-            # forming tuples
-            result.append((offset, len(message[start : ind]), next_sym))
-
-            # updating buffer
-            buffer += message[start : ind + 1]
-            buffer = buffer[-buffer_size:] if len(buffer) > 5 else buffer
-            ind += 1
+            # the last match can end the message without the next symbol
+            next_sym = message[ind + length] if ind + length < len(message) else None
+            result.append((offset, length, next_sym))
+            ind += length + 1
 
         return result
 
@@ -307,13 +289,15 @@ class Deflate:
     """
     @classmethod
     def deflate_encode(cls, message: str, buffer_size: int = 5, to_file = False,
-                       return_dict = False):
+                       return_dict = False, coder = None):
         """
         DEFLATE algorithm.
 
         Args:
             message (str): message to encode
             buffer_size (int): buffer size for lz77 algorithm
+            coder: entropy stage, object with encode(message) -> (encoded, table)
+                and decode(encoded, table) (default Huffman, e.g. ans.RANS)
 
         Returns:
             str: encoded str
@@ -322,7 +306,7 @@ class Deflate:
         >>> defl.deflate_encode('Hello')
         '11010011010111011000000111'
         """
-        huffman = Huffman()
+        huffman = Huffman() if coder is None else coder
 
         encoded_lz77 = []
 
@@ -342,13 +326,15 @@ class Deflate:
 
         return encoded_huffman
 
-    def deflate_decode(self, encoded_str: str, dictionary: DICTIONARY, buffer_size: int = 5):
+    def deflate_decode(self, encoded_str: str, dictionary: DICTIONARY, buffer_size: int = 5,
+                       coder = None):
         """
         Decoding deflate algorithms.
 
         Args:
             encoded_str (str): encode message
             buffer_size (int): buffer size for lz77 algorithm
+            coder: entropy stage that was used while encoding (default Huffman)
 
         Returns:
             str: decoded str
@@ -357,12 +343,17 @@ class Deflate:
         >>> b, d = defl.deflate_encode('Hello', return_dict = True)
         >>> defl.deflate_decode(b, d)
         'Hello'
+
+        >>> from ans import RANS
+        >>> b, d = defl.deflate_encode('Hello', return_dict = True, coder = RANS())
+        >>> defl.deflate_decode(b, d, coder = RANS())
+        'Hello'
         """
         if not isinstance(encoded_str, str) or not isinstance(buffer_size, int):
             return None
 
         lz77 = LZ77()
-        huffman = Huffman()
+        huffman = Huffman() if coder is None else coder
 
         decoded_huffman = huffman.decode(encoded_str, dictionary)
         list_of_tuples = [(int(decoded_huffman[i]), int(decoded_huffman[i + 1]),
@@ -375,28 +366,44 @@ class Deflate:
     @staticmethod
     def read_compress_file(file_path: str):
         """
-        Read content from file.
+        Read content from file and write it compressed to <name>_encoded.txt.
+        The file is a container frame (see container.py), so it can be
+        decoded by read_decompress_file without anything else.
 
         Args:
             path (str): path to the existing file
-
-        Returns:
-            list[tuple[int, int, str]]: compressed message
-            (list of tuples with three elements: <offset, lenght, next>)
         """
+        # container uses this module, so it is imported here
+        from container import Container
+
         if not isinstance(file_path, str) or not path.exists(file_path):
             return None
 
         if not path.isfile(file_path):
             return None
 
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-
         name = file_path.split('/')[-1].split('.')[0] + '_encoded'
+        Container.write_file(file_path, f'{name}.txt', 'deflate')
+
+        return None
+
+    @staticmethod
+    def read_decompress_file(file_path: str) -> str:
+        """
+        Decode file written by read_compress_file.
+
+        Args:
+            path (str): path to the encoded file
+
+        Returns:
+            str: decoded content
+        """
+        from container import Container
+
+        if not isinstance(file_path, str) or not path.isfile(file_path):
+            return None
 
-        with open(f'{name}.txt', 'w', encoding='utf-8') as file:
-            file.write(Deflate.deflate_encode(content))
+        return Container.read_file(file_path)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,32 @@
 """ Huffman algorithm """
 import heapq
+from concurrent.futures import ProcessPoolExecutor
 from pprint import pprint
 
 DICTIONARY = dict[str, str]
 
+# bits for the length of every stream (but the last one) in the jump header
+JUMP_BITS = 32
+
+
+def decode_stream(message: str, reverse_dictionary: dict) -> list[str]:
+    """Decode one stream of Huffman code (works in worker processes too)
+
+    >>> decode_stream('10001', {'00': 'b', '1': 'a', '01': 'c'})
+    ['a', 'b', 'c']
+    """
+    result = []
+    code = ''
+
+    for bit in message:
+        code += bit
+
+        if code in reverse_dictionary:
+            result.append(reverse_dictionary[code])
+            code = ''
+
+    return result
+
 class Huffman:
     """ Huffman algorithm """
     def encode(self, message: str) -> str:
@@ -38,11 +61,26 @@ class Huffman:
         >>> huffman.get_dictionary('abacabacacabaca')
         {'b': '00', 'a': '1', 'c': '01'}
         """
-        unique = set(message)
+        counts = {letter: message.count(letter) for letter in set(message)}
+        return self.get_dictionary_from_counts(counts)
+
+    def get_dictionary_from_counts(self, counts: dict[str, int]) -> DICTIONARY:
+        """dictionary of Huffman code for known letter counts
+
+        Args:
+            counts (dict[str, int]): how many times every letter is in message
+
+        Returns:
+            DICTIONARY: dictionary that was used to encode
+
+        >>> huffman = Huffman()
+        >>> huffman.get_dictionary_from_counts({'a': 8, 'b': 2, 'c': 5})
+        {'b': '00', 'a': '1', 'c': '01'}
+        """
         probabilities = []
 
-        for letter in unique:
-            heapq.heappush(probabilities, [message.count(letter), 0, letter])
+        for letter, count in counts.items():
+            heapq.heappush(probabilities, [count, 0, letter])
 
         # get encoding scheme and convert it to dictionary
         scheme = self.__create_scheme(probabilities)
@@ -130,6 +168,114 @@ class Huffman:
 
         return result
 
+    def encode_interleaved(self, message: str, streams: int = 4,
+                           dictionary: DICTIONARY = None) -> str:
+        """encode by Huffman algorithm into several interleaved streams with one
+        dictionary. Letter i goes to stream i % streams. Encoded message
+        starts with a jump header: lengths of all streams but the last one.
+
+        Args:
+            message (str): message to encode
+            streams (int): number of streams
+            dictionary (DICTIONARY, optional): dictionary of the message,
+                if it is already built (get_dictionary by default)
+
+        Returns:
+            str: encoded message
+
+        >>> huffman = Huffman()
+        >>> encoded = huffman.encode_interleaved('abacabacacabaca')
+        >>> len(encoded) - 3 * 32 == len(huffman.encode('abacabacacabaca'))
+        True
+        """
+        if dictionary is None:
+            dictionary = self.get_dictionary(message)
+
+        encoded = ["".join([dictionary[element] for element in message[idx::streams]])
+                   for idx in range(streams)]
+        header = "".join(format(len(stream), f'0{JUMP_BITS}b') for stream in encoded[:-1])
+
+        return header + "".join(encoded)
+
+    @staticmethod
+    def split_streams(message: str, streams: int = 4) -> list[str]:
+        """Split message encoded by encode_interleaved into streams by its jump header
+
+        >>> Huffman.split_streams('0' * 31 + '1' + '0' * 31 + '1' + '0' * 32 + '101', 4)
+        ['1', '0', '', '1']
+        """
+        idx = JUMP_BITS * (streams - 1)
+        result = []
+
+        for stream in range(streams - 1):
+            length = int(message[stream * JUMP_BITS : (stream + 1) * JUMP_BITS], 2)
+            result.append(message[idx : idx + length])
+            idx += length
+
+        result.append(message[idx:])
+        return result
+
+    def decode_interleaved(self, message: str, dictionary: DICTIONARY, streams: int = 4,
+                           workers = None) -> str:
+        """Decode message encoded by encode_interleaved.
+        Without workers all streams are decoded in one loop, one letter
+        from every stream in turn. With workers every stream is decoded
+        in its own process (worth it only for big messages).
+
+        Args:
+            message (str): encoded message
+            dictionary (DICTIONARY): dictionary that was created while encoding
+            streams (int): number of streams
+            workers (int, optional): number of processes
+
+        Returns:
+            str: decoded message
+
+        >>> huffman = Huffman()
+        >>> encoded = huffman.encode_interleaved('abacabacacabaca')
+        >>> huffman.decode_interleaved(encoded, {'b': '00', 'a': '1', 'c': '01'})
+        'abacabacacabaca'
+        """
+        reverse_dictionary = {value: key for key, value in dictionary.items()}
+        encoded = self.split_streams(message, streams)
+
+        if workers is not None:
+            with ProcessPoolExecutor(workers) as executor:
+                decoded = list(executor.map(decode_stream, encoded,
+                                            [reverse_dictionary] * streams))
+
+            # stream i has letters i, i + streams, ... of the message
+            result = [""] * sum(len(stream) for stream in decoded)
+            for idx, stream in enumerate(decoded):
+                result[idx::streams] = stream
+
+            return "".join(result)
+
+        result = []
+        positions = [0] * streams
+        active = streams
+
+        while active:
+            active = 0
+
+            for stream, bits in enumerate(encoded):
+                idx = positions[stream]
+
+                if idx >= len(bits):
+                    continue
+
+                active += 1
+                code = ''
+
+                while code not in reverse_dictionary:
+                    code += bits[idx]
+                    idx += 1
+
+                result.append(reverse_dictionary[code])
+                positions[stream] = idx
+
+        return "".join(result)
+
     def assertion(self, message: str, verbose = False):
         """Test a string. Prints encoded message, dictionary and 
         checks weather message == decode(encode(message)).
@@ -152,6 +298,33 @@ class Huffman:
         assert message == self.decode(encoded, dictionary)
 
 
+class InterleavedHuffman:
+    """
+    Interleaved Huffman with the interface of an entropy stage:
+    encode returns encoded message and dictionary, decode takes both.
+    It can be the entropy stage of Deflate (coder argument).
+
+    >>> from deflate import Deflate
+    >>> encoded, dictionary = Deflate.deflate_encode('Hello', return_dict=True,
+    ...                                              coder=InterleavedHuffman())
+    >>> Deflate().deflate_decode(encoded, dictionary, coder=InterleavedHuffman())
+    'Hello'
+    """
+    def __init__(self, streams: int = 4, workers = None):
+        self.streams = streams
+        self.workers = workers
+        self.huffman = Huffman()
+
+    def encode(self, message: str) -> tuple[str, DICTIONARY]:
+        """encode message into interleaved streams"""
+        dictionary = self.huffman.get_dictionary(message)
+        return self.huffman.encode_interleaved(message, self.streams, dictionary), dictionary
+
+    def decode(self, message: str, dictionary: DICTIONARY) -> str:
+        """decode interleaved streams"""
+        return self.huffman.decode_interleaved(message, dictionary, self.streams, self.workers)
+
+
 if __name__ == "__main__":
     huffman = Huffman()
     huffman.assertion('this is an example of a huffman tree', verbose=True)
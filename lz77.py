@@ -23,66 +23,41 @@ class LZ77:
         >>> lz77 = LZ77()
         >>> lz77.compress('abacabacabadaca')
         [(0, 0, 'a'), (0, 0, 'b'), (2, 1, 'c'), (4, 7, 'd'), (2, 1, 'c'), (2, 1, None)]
+        >>> lz77.decompress(lz77.compress('adacddcaaaadcdccdcddadcbdbabccbcdccdcdcd'))
+        'adacddcaaaadcdccdcddadcbdbabccbcdccdcdcd'
         """
         if not all([isinstance(message, str), isinstance(buffer_size, int)]):
             return None
 
         result = []
-        buffer = ''
         ind = 0
 
         while ind < len(message):
-            start = ind
-            copy_buff = buffer
-
-            # finding the subsrting in the buffer
-            while message[start : ind + 1] in buffer and ind != len(message):
-                ind += 1
-
-                # extending the buffer by two when the substring is not in it
-                if message[start : ind + 1] not in buffer:
-                    buffer *= 2
-
-            # saving extended buffer to check the correctness of the offset
-            ext_buff = buffer
-            # returning the buffer to it's initial form if it was extended
-            buffer = copy_buff
-            i = ind + 1
-
-            # finding offset
-            substr = message[start : i]
-            copy_substr = substr[:-1]
-
-            # finding the substring in the buffer
-            # decrementing the i by one to find the substring
-            while substr not in buffer:
-                i -= 1
-                substr = message[start : i]
-
-            offset = 0 if len(substr) == 0 else buffer.rfind(substr)
-
-            if len(substr) != 0:
-                offset = len(buffer) - offset
-
-            # checking if the substring is in the extended buffer
-            # to get the correct offset
-            while copy_substr != ext_buff[
-                len(buffer) - offset : len(buffer) - offset + len(copy_substr)]:
-                offset -= 1
-
-            # getting the next symbol
-            if len(message[start : ind + 1]) == ind - start:
-                next_sym = None
-            else:
-                next_sym = message[start : ind + 1][-1]
+            # the decoder sees only the last buffer_size letters
+            buffer = message[max(0, ind - buffer_size) : ind]
+            offset, length = 0, 0
+
+            # a match can run past the end of the buffer: it goes on from the
+            # start of the buffer again, like buffer * n in decompress.
+            # The nearest match is checked first, farther ones must be longer
+            start = buffer.rfind(message[ind])
+
+            while start != -1:
+                size = 1
+
+                while (ind + size < len(message)
+                       and message[ind + size] == buffer[(start + size) % len(buffer)]):
+                    size += 1
+
+                if size > length:
+                    offset, length = len(buffer) - start, size
 
-            # forming tuples
-            result.append((offset, len(message[start : ind]), next_sym))
+                start = buffer.rfind(message[ind], 0, start)
 
-            # updating buffer
-            buffer += message[start : ind + 1]
-            buffer = buffer[-buffer_size:] if len(buffer) > 5 else buffer
-            ind += 1
+            # the last match can end the message without the next symbol
+            next_sym = message[ind + length] if ind + length < len(message) else None
+            result.append((offset, length, next_sym))
+            ind += length + 1
 
         return result
 
@@ -132,15 +107,16 @@ class LZ77:
     @classmethod
     def read_compress_file(cls, file_path: str):
         """
-        Read content from file.
+        Read content from file and write it compressed to <name>_encoded.txt.
+        The file is a container frame (see container.py), so it can be
+        decoded by read_decompress_file without anything else.
 
         Args:
             path (str): path to the existing file
-
-        Returns:
-            list[tuple[int, int, str]]: compressed message
-            (list of tuples with three elements: <offset, lenght, next>)
         """
+        # container uses this module, so it is imported here
+        from container import Container
+
         if not isinstance(file_path, str) or not path.exists(file_path):
             return None
 
@@ -148,20 +124,28 @@ class LZ77:
             print(f"There is not such file {file_path}")
             return None
 
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-
         name = file_path.split('/')[-1].split('.')[0] + '_encoded'
+        Container.write_file(file_path, f'{name}.txt', 'lz77')
 
-        with open(f'{name}.txt', 'w', encoding='utf-8') as fil:
-            result = []
+        return None
 
-            for offset, length, next_character in cls.compress(content):
-                result.append(f"{offset}{length}{next_character or ' '}")
+    @staticmethod
+    def read_decompress_file(file_path: str) -> str:
+        """
+        Decode file written by read_compress_file.
 
-            fil.write("".join(result))
+        Args:
+            path (str): path to the encoded file
 
-        return None
+        Returns:
+            str: decoded content
+        """
+        from container import Container
+
+        if not isinstance(file_path, str) or not path.isfile(file_path):
+            return None
+
+        return Container.read_file(file_path)
 
     @classmethod
     def assertion(cls, message: str) -> bool:
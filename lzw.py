@@ -23,8 +23,8 @@ class LZW:
 
         # go through every letter
         while idx < message_length:
-            # get str of every length
-            for length in range(1, message_length + 1):
+            # get str of every length (one more than left, so the loop always breaks)
+            for length in range(1, message_length - idx + 2):
                 current = message[idx : idx + length]
 
                 # if this substr is in dictionary skip this
@@ -0,0 +1,504 @@
+""" Asyncio compression service """
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from huffman import Huffman
+from lz77 import LZ77
+from lzw import LZW
+from deflate import Deflate
+
+CHUNK_SIZE = 64 * 1024
+
+
+def huffman_compress(message: str, params: dict) -> dict:
+    """Huffman part of the service (runs in a worker process)
+
+    >>> huffman_compress('abacabacacabaca', {})
+    {'data': '1001011001011011001011', 'dictionary': {'b': '00', 'a': '1', 'c': '01'}}
+    """
+    huffman = Huffman()
+    return {"data": huffman.encode(message),
+            "dictionary": huffman.get_dictionary(message)}
+
+
+def huffman_decompress(payload: dict, params: dict) -> str:
+    """Huffman part of the service (runs in a worker process)"""
+    return Huffman().decode(payload["data"], payload["dictionary"])
+
+
+def lz77_compress(message: str, params: dict) -> dict:
+    """LZ77 part of the service (runs in a worker process)
+
+    >>> lz77_compress('abacaba', {'buffer_size': 5})
+    {'data': [(0, 0, 'a'), (0, 0, 'b'), (2, 1, 'c'), (4, 3, None)], 'buffer_size': 5}
+    """
+    buffer_size = params.get("buffer_size", 5)
+    return {"data": LZ77.compress(message, buffer_size), "buffer_size": buffer_size}
+
+
+def lz77_decompress(payload: dict, params: dict) -> str:
+    """LZ77 part of the service (runs in a worker process)"""
+    # json turns tuples into lists
+    encoded = [tuple(element) for element in payload["data"]]
+    return LZ77.decompress(encoded, payload.get("buffer_size", 5))
+
+
+def lzw_compress(message: str, params: dict) -> dict:
+    """LZW part of the service (runs in a worker process)
+
+    >>> lzw_compress('abacabadabacacacd', {})
+    {'data': [0, 1, 0, 2, 4, 0, 3, 8, 7, 12, 3], 'dictionary': ['a', 'b', 'c', 'd']}
+    """
+    lzw = LZW()
+    return {"data": lzw.compress(message),
+            "dictionary": lzw.get_initial_dictionary(message)}
+
+
+def lzw_decompress(payload: dict, params: dict) -> str:
+    """LZW part of the service (runs in a worker process)"""
+    return LZW.decompress(payload["data"], list(payload["dictionary"]))
+
+
+def deflate_compress(message: str, params: dict) -> dict:
+    """DEFLATE part of the service (runs in a worker process)
+
+    >>> deflate_compress('Hello', {})['data']
+    '11010011010111011000000111'
+    """
+    buffer_size = params.get("buffer_size", 5)
+    encoded, dictionary = Deflate.deflate_encode(message, buffer_size, return_dict=True)
+    return {"data": encoded, "dictionary": dictionary, "buffer_size": buffer_size}
+
+
+def deflate_decompress(payload: dict, params: dict) -> str:
+    """DEFLATE part of the service (runs in a worker process)"""
+    return Deflate().deflate_decode(payload["data"], payload["dictionary"],
+                                    payload.get("buffer_size", 5))
+
+
+CODECS = {
+    "huffman": (huffman_compress, huffman_decompress),
+    "lz77": (lz77_compress, lz77_decompress),
+    "lzw": (lzw_compress, lzw_decompress),
+    "deflate": (deflate_compress, deflate_decompress),
+}
+
+
+def run_job(operation: str, codec: str, body: bytes, params: dict) -> bytes:
+    """Run one compress/decompress job. It is executed in the process pool,
+    so it gets and returns only bytes.
+
+    Args:
+        operation (str): 'compress' or 'decompress'
+        codec (str): name of the codec from CODECS
+        body (bytes): message (utf-8) or json payload of compressed message
+        params (dict): codec parameters (e.g. buffer_size)
+
+    Returns:
+        bytes: json payload or decoded message (utf-8)
+
+    >>> run_job('compress', 'lzw', b'abab', {})
+    b'{"data": [0, 1, 2], "dictionary": ["a", "b"]}'
+    >>> run_job('decompress', 'lzw', b'{"data": [0, 1, 2], "dictionary": ["a", "b"]}', {})
+    b'abab'
+    """
+    compress, decompress = CODECS[codec]
+
+    if operation == "compress":
+        return json.dumps(compress(body.decode("utf-8"), params)).encode("utf-8")
+
+    return decompress(json.loads(body), params).encode("utf-8")
+
+
+class ServiceStats:
+    """ Latency and throughput counters of the service """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, bytes_in: int, bytes_out: int, latency: float, error = False):
+        """Add one finished request to the counters"""
+        self.requests += 1
+        self.errors += int(error)
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def as_dict(self) -> dict:
+        """All counters (and values derived from them) as a dict
+
+        >>> stats = ServiceStats()
+        >>> stats.record(100, 50, 0.5)
+        >>> stats.record(300, 10, 1.5, error=True)
+        >>> result = stats.as_dict()
+        >>> result['requests'], result['errors'], result['mean_latency'], result['max_latency']
+        (2, 1, 1.0, 1.5)
+        """
+        uptime = time.perf_counter() - self.started
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "mean_latency": self.total_latency / self.requests if self.requests else 0.0,
+            "max_latency": self.max_latency,
+            "uptime": uptime,
+            "requests_per_second": self.requests / uptime if uptime else 0.0,
+            "bytes_per_second": self.bytes_in / uptime if uptime else 0.0,
+        }
+
+
+async def write_body(writer: asyncio.StreamWriter, chunks):
+    """Write a chunked body: every chunk is '<length>\\n<data>', body ends with '0\\n'.
+    Waits for the transport after every chunk, so a slow reader slows the writer.
+    """
+    async def iterate():
+        if isinstance(chunks, (bytes, str)):
+            yield chunks
+        elif hasattr(chunks, "__aiter__"):
+            async for chunk in chunks:
+                yield chunk
+        else:
+            for chunk in chunks:
+                yield chunk
+
+    async for chunk in iterate():
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+
+        for start in range(0, len(chunk), CHUNK_SIZE):
+            part = chunk[start : start + CHUNK_SIZE]
+            writer.write(f"{len(part)}\n".encode() + part)
+            await writer.drain()
+
+    writer.write(b"0\n")
+    await writer.drain()
+
+
+class BodyTooLarge(ValueError):
+    """ Request body is larger than the limit of the server """
+
+
+async def read_body(reader: asyncio.StreamReader, max_size = None) -> bytes:
+    """Read a chunked body written by write_body.
+    Too large body is still read to the end, so the connection stays usable,
+    but it is skipped in pieces of CHUNK_SIZE and never kept in memory.
+
+    >>> async def oversize():
+    ...     reader = asyncio.StreamReader()
+    ...     reader.feed_data(b'5000\\n' + b'x' * 5000 + b'0\\n2\\nok0\\n')
+    ...     try:
+    ...         await read_body(reader, max_size=1000)
+    ...     except BodyTooLarge as error:
+    ...         return str(error), await read_body(reader, max_size=1000)
+    >>> asyncio.run(oversize())
+    ('body is larger than 1000 bytes', b'ok')
+    """
+    body = bytearray()
+    size = 0
+
+    while True:
+        length = int(await reader.readline())
+
+        if length == 0:
+            break
+
+        size += length
+
+        if max_size is None or size <= max_size:
+            body += await reader.readexactly(length)
+            continue
+
+        body.clear()
+
+        while length > 0:
+            skipped = min(length, CHUNK_SIZE)
+            await reader.readexactly(skipped)
+            length -= skipped
+
+    if max_size is not None and size > max_size:
+        raise BodyTooLarge(f"body is larger than {max_size} bytes")
+
+    return bytes(body)
+
+
+class CompressionServer:
+    """
+    Local TCP (or unix-socket) server, that sends compress/decompress
+    jobs to a process pool.
+
+    Every request is a json header line ({"op": ..., "codec": ..., "params": ...})
+    and a chunked body. Jobs wait in a bounded queue: when it is full,
+    the server stops reading new requests until workers free it.
+
+    >>> async def main():
+    ...     async with CompressionServer(workers=1) as server:
+    ...         async with await CompressionClient.connect(port=server.port) as client:
+    ...             payload = await client.compress('lzw', ['abac', 'aba'])
+    ...             message = await client.decompress('lzw', payload)
+    ...             stats = await client.stats()
+    ...     return payload['data'], message, stats['requests']
+    >>> asyncio.run(main())
+    ([0, 1, 0, 2, 3, 0], 'abacaba', 2)
+
+    Errors of a request are sent back, the connection stays open:
+
+    >>> async def broken():
+    ...     async with CompressionServer(workers=1) as server:
+    ...         async with await CompressionClient.connect(port=server.port) as client:
+    ...             try:
+    ...                 await client.decompress('lzw', {'data': [5], 'dictionary': ['a']})
+    ...             except ServiceError as error:
+    ...                 print(error)
+    ...             client._writer.write(b'not json\\n0\\n')
+    ...             print(await client._reader.readline(), await read_body(client._reader))
+    ...             return await client.decompress('lzw', {'data': [0], 'dictionary': ['a']})
+    >>> asyncio.run(broken())
+    IndexError: list index out of range
+    b'error\\n' b'ValueError: header is not json: Expecting value: line 1 column 1 (char 0)'
+    'a'
+    """
+    def __init__(self, host = "127.0.0.1", port = 0, path = None, workers = None,
+                 queue_size = 64, max_body_size = 64 * 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_body_size = max_body_size
+        self.stats = ServiceStats()
+
+        self._executor = None
+        self._queue = None
+        self._dispatchers = []
+        self._connections = set()
+        self._server = None
+
+    async def start(self):
+        """Start process pool, dispatchers and listening socket"""
+        self._executor = ProcessPoolExecutor(self.workers)
+        self._queue = asyncio.Queue(self.queue_size)
+
+        # one dispatcher per worker, so the pool never has more jobs than workers
+        workers = self.workers or os.cpu_count() or 1
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(workers)]
+
+        if self.path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, self.path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop accepting requests and shut down workers"""
+        self._server.close()
+        await self._server.wait_closed()
+
+        tasks = [*self._connections, *self._dispatchers]
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._executor.shutdown()
+
+    async def serve_forever(self):
+        """Start the server and serve until cancelled"""
+        await self.start()
+
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _dispatch(self):
+        """Take jobs from the queue and run them in the pool"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            job, future = await self._queue.get()
+
+            try:
+                result = await loop.run_in_executor(self._executor, run_job, *job)
+                if not future.cancelled():
+                    future.set_result(result)
+            except Exception as error:  # pylint: disable=broad-except
+                if not future.cancelled():
+                    future.set_exception(error)
+            finally:
+                self._queue.task_done()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve all requests of one connection"""
+        self._connections.add(asyncio.current_task())
+
+        try:
+            while True:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                if not await self._handle_request(line, reader, writer):
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def _handle_request(self, line: bytes, reader, writer) -> bool:
+        """Read body of one request, run it and send the response.
+        Any error of the request is sent to the client as an error response.
+
+        Returns:
+            bool: False if the connection can't be used anymore
+            (body is not in the chunked format)
+        """
+        started = time.perf_counter()
+        body = b""
+        keep_open = True
+
+        try:
+            header = json.loads(line)
+        except ValueError as error:
+            header = error
+
+        try:
+            try:
+                body = await read_body(reader, self.max_body_size)
+            except BodyTooLarge:
+                raise
+            except ValueError as error:
+                keep_open = False
+                raise ValueError(f"broken body: {error}") from error
+
+            if isinstance(header, Exception):
+                raise ValueError(f"header is not json: {header}")
+
+            if not isinstance(header, dict):
+                raise ValueError("header must be a json object")
+
+            operation = header.get("op")
+
+            if operation == "stats":
+                result = json.dumps(self.stats.as_dict()).encode("utf-8")
+            elif operation not in ("compress", "decompress"):
+                raise ValueError(f"unknown operation {operation!r}")
+            elif header.get("codec") not in CODECS:
+                raise ValueError(f"unknown codec {header.get('codec')!r}")
+            else:
+                future = asyncio.get_running_loop().create_future()
+                job = (operation, header["codec"], body, header.get("params", {}))
+
+                # waits while the queue is full
+                await self._queue.put((job, future))
+                result = await future
+
+            status = "ok"
+        except Exception as error:  # pylint: disable=broad-except
+            status, result = "error", f"{type(error).__name__}: {error}".encode("utf-8")
+
+        writer.write(f"{status}\n".encode())
+        await write_body(writer, result)
+
+        if not isinstance(header, dict) or header.get("op") != "stats":
+            self.stats.record(len(body), len(result), time.perf_counter() - started,
+                              error = status != "ok")
+
+        return keep_open
+
+
+class ServiceError(Exception):
+    """ Error returned by the compression server """
+
+
+class CompressionClient:
+    """ Async client for CompressionServer """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, host = "127.0.0.1", port = None, path = None):
+        """Connect to a server by TCP port or by unix-socket path"""
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+
+        return cls(reader, writer)
+
+    async def request(self, operation: str, codec = None, body = b"", params = None) -> bytes:
+        """Send one request and wait for the response body
+
+        Args:
+            operation (str): 'compress', 'decompress' or 'stats'
+            codec (str): codec name
+            body: bytes, str or (async) iterable of them
+            params (dict): codec parameters
+
+        Returns:
+            bytes: response body
+        """
+        header = {"op": operation, "codec": codec, "params": params or {}}
+
+        # one connection carries only one request at a time
+        async with self._lock:
+            self._writer.write(json.dumps(header).encode("utf-8") + b"\n")
+            await write_body(self._writer, body)
+
+            status = (await self._reader.readline()).strip()
+            result = await read_body(self._reader)
+
+        if status != b"ok":
+            raise ServiceError(result.decode("utf-8"))
+
+        return result
+
+    async def compress(self, codec: str, message, **params) -> dict:
+        """Compress message (str or iterable of str chunks) on the server"""
+        return json.loads(await self.request("compress", codec, message, params))
+
+    async def decompress(self, codec: str, payload: dict, **params) -> str:
+        """Decompress payload returned by compress"""
+        body = json.dumps(payload).encode("utf-8")
+        return (await self.request("decompress", codec, body, params)).decode("utf-8")
+
+    async def stats(self) -> dict:
+        """Latency/throughput counters of the server"""
+        return json.loads(await self.request("stats"))
+
+    async def close(self):
+        """Close connection"""
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod())